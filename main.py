@@ -7,14 +7,71 @@ such as tab management for different functionalities, a serial connection for
 communication, and a message log for tracking user actions and printer responses.
 """
 
+from collections import deque
+import glob
+import os
+import sys
+import time
 import tkinter as tk
 from tkinter import ttk
 import serial.tools.list_ports
 import serial
 from ui.tab_manager import setup_tabs
+from utils.gcode_utils import parse_temperature
+from utils.serial_worker import SerialWorker
 
+if sys.platform == "win32":
+    import winreg  # pylint: disable=import-error
 
-class PrinterControlApp:
+# Interval at which responses from the serial worker are handed to the UI on
+# platforms where Tk cannot watch a pipe for them, in milliseconds
+RESPONSE_POLL_MS = 30
+
+# Maximum number of messages kept in the message log
+MAX_LOG_ROWS = 2000
+
+# Delay before queued messages are written to the message listbox, in milliseconds
+LOG_FLUSH_MS = 50
+
+# How long a serial port enumeration is reused, in seconds
+PORTS_CACHE_TTL = 2.0
+
+# Device nodes used by USB serial adapters and USB CDC printer boards on Linux
+LINUX_PORT_PATTERNS = ("/dev/ttyUSB*", "/dev/ttyACM*")
+
+
+def scan_serial_ports():
+    """
+    Scan the system for serial port device names.
+
+    On Linux and Windows the device names are read directly from `/dev` and the
+    registry, which avoids the per-device metadata lookups done by pyserial. If
+    that finds nothing, or on other platforms, pyserial's `comports()` is used.
+
+    Returns:
+        list of str: The device names of the serial ports found.
+    """
+    ports = []
+    if sys.platform.startswith("linux"):
+        for pattern in LINUX_PORT_PATTERNS:
+            ports.extend(glob.glob(pattern))
+        ports.sort()
+    elif sys.platform == "win32":
+        try:
+            with winreg.OpenKey(
+                winreg.HKEY_LOCAL_MACHINE, r"HARDWARE\DEVICEMAP\SERIALCOMM"
+            ) as key:
+                for index in range(winreg.QueryInfoKey(key)[1]):
+                    ports.append(winreg.EnumValue(key, index)[1])
+        except OSError:
+            pass
+
+    if not ports:
+        ports = [port.device for port in serial.tools.list_ports.comports()]
+    return ports
+
+
+class PrinterControlApp:  # pylint: disable=too-many-instance-attributes
     """
     The main application class for the 3D Printer Control interface.
 
@@ -23,8 +80,12 @@ class PrinterControlApp:
 
     Attributes:
         root (tk.Tk): The root window of the Tkinter application.
+        serial (SerialWorker): The worker thread communicating with the printer.
         serial_connection (serial.Serial): The serial connection to the printer.
-        message_log (list of str): A list to store logged messages.
+        last_temp (float): The last hotend temperature reported, or None.
+        last_temp_time (float): When `last_temp` was reported, in monotonic time.
+        firmware_capabilities (dict): The capabilities reported by M115, by name.
+        message_log (collections.deque of str): The most recent logged messages.
         tabs (ttk.Notebook): The notebook widget managing application tabs.
         message_frame (ttk.Frame): A frame containing the message log at the bottom.
         message_listbox (tk.Listbox): A listbox widget to display logged messages.
@@ -38,8 +99,31 @@ class PrinterControlApp:
             root (tk.Tk): The root window of the application.
         """
         self.root = root
-        self.serial_connection = None
-        self.message_log = []
+        self.message_log = deque(maxlen=MAX_LOG_ROWS)
+        self._pending_messages = deque(maxlen=MAX_LOG_ROWS)
+        self._flush_scheduled = False
+        self._ports_cache = None
+        self._ports_cache_time = 0.0
+
+        # Serial I/O runs in a worker thread; responses are handed back to the
+        # Tk thread in the order the commands were sent
+        self._pending_responses = deque()  # (future, callback) pairs
+        self._received_lines = deque()  # Lines not yet passed to the listeners
+        self._line_listeners = []
+        self._temperature_listeners = []
+        self._poll_id = None
+        self._wakeup_pipe = self._create_wakeup_pipe()
+        self.serial = SerialWorker(
+            notify=self._wake_up, on_lines=self._received_lines.extend
+        )
+        self.serial.start()
+
+        # Keep the latest temperature reported by the printer, pushed by its
+        # auto-reports (M155) or received in response to M105
+        self.last_temp = None
+        self.last_temp_time = 0.0
+        self.add_line_listener(self._update_last_temp)
+        self.firmware_capabilities = {}
 
         # Set up the main menu
         self.setup_main_menu()
@@ -81,18 +165,43 @@ class PrinterControlApp:
         """
         Append a message to the message log and update the message listbox.
 
+        Messages are queued and written to the listbox in batches every
+        `LOG_FLUSH_MS`, so bursts of messages cost a single widget update.
+
         Args:
             message (str): The message to log and display.
         """
         self.message_log.append(message)
-        self.message_listbox.insert(tk.END, message)
+        self._pending_messages.append(message)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after(LOG_FLUSH_MS, self._flush_messages)
+
+    def _flush_messages(self):
+        """
+        Write the queued messages to the message listbox in a single call.
+
+        Only the last `MAX_LOG_ROWS` messages are kept, so the listbox does not
+        slow down over a long session.
+        """
+        self._flush_scheduled = False
+        batch = list(self._pending_messages)
+        self._pending_messages.clear()
+        self.message_listbox.insert(tk.END, *batch)
+
+        # Drop the oldest rows in a single call once the limit is exceeded
+        excess = self.message_listbox.size() - MAX_LOG_ROWS
+        if excess > 0:
+            self.message_listbox.delete(0, excess - 1)
+        self.message_listbox.see(tk.END)
 
     def list_serial_ports(self):
         """
         Return a list of available serial ports.
 
         This method queries the system for connected serial devices and lists
-        their device names.
+        their device names. Enumerating ports can be slow, so the result is
+        reused for `PORTS_CACHE_TTL` seconds.
 
         Returns:
             list of str: A list of device names for available serial ports.
@@ -102,39 +211,157 @@ class PrinterControlApp:
             print(ports)
             # Output: ["/dev/ttyUSB0", "/dev/ttyUSB1"]
         """
-        return [port.device for port in serial.tools.list_ports.comports()]
+        now = time.monotonic()
+        if (
+            self._ports_cache is not None
+            and now - self._ports_cache_time < PORTS_CACHE_TTL
+        ):
+            return self._ports_cache
 
-    def read_response(self):
+        ports = scan_serial_ports()
+        self._ports_cache = ports
+        self._ports_cache_time = now
+        return ports
+
+    def invalidate_ports_cache(self):
+        """
+        Forget the cached serial ports so the next lookup rescans the system.
         """
-        Read the response from the printer via the serial connection.
+        self._ports_cache = None
 
-        This method continuously reads lines from the printer until a response
-        containing 'ok' or 'error' is received, indicating the end of the response.
+    @property
+    def serial_connection(self):
+        """
+        serial.Serial: The serial connection to the printer, owned by `serial`.
+        """
+        return self.serial.connection
 
-        Returns:
-            list of str: A list of lines received as a response from the printer.
+    @serial_connection.setter
+    def serial_connection(self, connection):
+        self.serial.connection = connection
+
+    def send_command(self, gcode, callback=None, match=None):
+        """
+        Send a G-code command and pass its response to a callback.
+
+        This does not block the Tk event loop. The command is queued for the
+        serial worker thread, which sends it and reads the response, and
+        `callback` is invoked on the Tk thread with the response. Commands are
+        sent in the order they are queued.
+
+        Args:
+            gcode (str or bytes): The G-code command to send, or its encoded line
+                                  (ending with a newline) to write as is.
+            callback (function, optional): Called with the list of response lines,
+                                           or with `match`, the matching line.
+            match (str, optional): A keyword to search for in the response.
 
         Example:
-            response = app.read_response()
-            print(response)
-            # Output: ["ok T:200 /200", "ok"]
+            app.send_command("M105", print)
+            # Output: ["ok T:200 /200"]
         """
-        if not self.serial_connection:
-            return []
+        future = self.serial.submit(gcode, match)
+        if callback:
+            self._pending_responses.append((future, callback))
+            self._schedule_poll()
 
-        # Read the data from the printer (response to G-codes)
-        response = []
+    def add_line_listener(self, listener):
+        """
+        Pass every line received from the printer to a listener.
+
+        This includes lines the printer sends on its own, such as temperature
+        auto-reports, as well as responses to commands.
+
+        Args:
+            listener (function): Called on the Tk thread with each received line.
+        """
+        self._line_listeners.append(listener)
+        self._schedule_poll()
+
+    def add_temperature_listener(self, listener):
+        """
+        Pass every hotend temperature reported by the printer to a listener.
+
+        The listener is called after `last_temp` and `last_temp_time` were updated.
+
+        Args:
+            listener (function): Called on the Tk thread with each reported
+                                 temperature.
+        """
+        self._temperature_listeners.append(listener)
+
+    def _update_last_temp(self, line):
+        """
+        Remember the hotend temperature if the line is a temperature report.
+
+        Args:
+            line (str): A line received from the printer.
+        """
+        # Auto-reports start with "T:", responses to M105 with "ok T:"
+        if line.startswith(("T:", "ok T:")):
+            current_temp = parse_temperature(line)
+            if current_temp is not None:
+                self.last_temp = current_temp
+                self.last_temp_time = time.monotonic()
+                for listener in self._temperature_listeners:
+                    listener(current_temp)
+
+    def _create_wakeup_pipe(self):
+        """
+        Create a pipe through which the serial worker wakes up the Tk event loop.
+
+        Tk watches the read end of the pipe alongside its own events, so responses
+        are handled as soon as they arrive instead of on a polling timer.
+
+        Returns:
+            tuple of int: The read and write ends of the pipe, or None where Tk
+                          cannot watch files (Windows).
+        """
+        if not hasattr(self.root.tk, "createfilehandler"):
+            return None
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        self.root.tk.createfilehandler(read_fd, tk.READABLE, self._on_wakeup)
+        return read_fd, write_fd
+
+    def _wake_up(self):
+        """
+        Signal the Tk thread that data was received, from the worker thread.
+        """
+        if self._wakeup_pipe:
+            os.write(self._wakeup_pipe[1], b"\0")
+
+    def _on_wakeup(self, read_fd, _mask):
+        """
+        Handle the data the serial worker signalled through the wakeup pipe.
+        """
         try:
-            # Let's assume we're reading until we receive a complete response
-            while True:
-                line = self.serial_connection.readline().decode("utf-8").strip()
-                if line:
-                    response.append(line)
-                if "ok" in line.lower() or "error" in line.lower():
-                    break
-        except serial.SerialException as e:
-            print(f"Error reading from serial port: {e}")
-        return response
+            os.read(read_fd, 4096)
+        except BlockingIOError:
+            pass
+        self._drain_responses()
+
+    def _schedule_poll(self):
+        """
+        Poll for data where the serial worker cannot wake up the Tk thread.
+        """
+        if not self._wakeup_pipe and self._poll_id is None:
+            self._poll_id = self.root.after(RESPONSE_POLL_MS, self._drain_responses)
+
+    def _drain_responses(self):
+        """
+        Pass the lines and responses received so far on, on the Tk thread.
+        """
+        self._poll_id = None
+        while self._received_lines:
+            line = self._received_lines.popleft()
+            for listener in self._line_listeners:
+                listener(line)
+        while self._pending_responses and self._pending_responses[0][0].done():
+            future, callback = self._pending_responses.popleft()
+            callback(future.result())
+        if self._pending_responses or self._line_listeners:
+            self._schedule_poll()
 
 
 def create_app():
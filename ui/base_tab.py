@@ -6,8 +6,7 @@ tabs to a Tkinter `ttk.Notebook` widget. Each tab is represented by a
 `ttk.Frame` widget that is automatically added to the notebook with a specified name.
 """
 
-from tkinter import ttk
-from utils.gcode_utils import send_gcode, parse_gcode_response
+from tkinter import ttk, messagebox
 
 
 class BaseTab:
@@ -32,6 +31,8 @@ class BaseTab:
         self.tab_name = tab_name
         self.frame = ttk.Frame(tabs)
         self.tabs.add(self.frame, text=tab_name)
+        self._after_id = None  # The pending periodic update, if any
+        self.frame.bind("<Destroy>", self._on_destroy)
         self.update_periodic_tasks()
 
     def log_message(self, message):
@@ -56,36 +57,56 @@ class BaseTab:
         """
         Set a status message on the UI.
 
+        The message is added to the app's message log. An error is also shown
+        in an error dialog.
+
         Args:
             message (str): The message to display.
             error (bool): Whether the message is an error.
         """
+        self.log_message(message)
         if error:
-            self.frame.configure(bg="red")
-        else:
-            self.frame.configure(bg="green")
-        self.app.set_status(message)
+            messagebox.showerror("Error", message)
 
     def update_periodic_tasks(self):
         """
         Schedule tasks to update periodically, e.g., temperature readings.
+
+        Only one update is pending at a time, and it is cancelled when the tab
+        is destroyed.
         """
-        self.frame.after(1000, self.update_periodic_tasks)
+        if self._after_id is None:
+            self._after_id = self.frame.after(1000, self._run_periodic_tasks)
 
-    def send_and_receive_gcode(self, gcode, response_marker):
+    def _run_periodic_tasks(self):
+        """
+        Run the periodic tasks and schedule the next update.
+        """
+        self._after_id = None
+        self.update_periodic_tasks()
+
+    def _on_destroy(self, _event):
+        """
+        Cancel the pending periodic update when the tab's frame is destroyed.
         """
-        Send a G-code command and wait for a response.
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+
+    def send_and_receive_gcode(self, gcode, response_marker, callback):
+        """
+        Send a G-code command and pass the response to a callback.
+
+        The command is sent by the app's serial worker, so this returns right
+        away; `callback` is invoked on the Tk thread once the printer answered.
 
         Args:
             gcode (str): The G-code command to send.
-            response_marker (str): A keyword to search for in the response.
-
-        Returns:
-            str: The response message.
-        """
-        send_gcode(self.app.serial_connection, gcode, self.app.append_message)
-        response = parse_gcode_response(self.app.serial_connection)
-        for line in response:
-            if response_marker in line:
-                return line
-        return None
+            response_marker (str): A keyword to search for in the response, or None
+                                   to pass all response lines to `callback`.
+            callback (function): Called with the first response line containing
+                                 `response_marker`, or None if there is none.
+        """
+        if self.app.serial_connection:
+            self.log_message(f"Sent: {gcode}")
+        self.app.send_command(gcode, callback, match=response_marker)
@@ -6,14 +6,116 @@ to provide a user interface for connecting to a 3D printer. It includes function
 for managing connection settings, auto-homing, and displaying printer data.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import re
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import time
 import serial
 from ui.base_tab import BaseTab
+from utils.gcode_utils import RESPONSE_END_RE, parse_capabilities
+
+# Splits a response line into key and value at its first ':', or else its first '='
+KEY_VALUE_RE = re.compile(r"^\s*(?:([^:]*?)\s*:|([^:=]*?)\s*=)\s*(.*?)\s*$")
+
+# G-codes sent to get the printer settings, with the label of their treeview node
+REFRESH_GCODES = (
+    ("Firmware Info", b"M115\n"),  # Get firmware information
+    ("Current Settings", b"M503\n"),  # Get current printer settings
+    ("Position", b"M114\n"),  # Get current position
+    ("Endstop Status", b"M119\n"),  # Endstop status
+)
+
+# How long a serial port is given to answer when looking for the printer, in seconds
+PROBE_TIMEOUT = 3.0
+
+# Maximum number of serial ports probed at the same time
+MAX_PROBE_WORKERS = 8
+
+
+def probe_port(port):
+    """
+    Open a serial port and check whether a printer answers on it.
+
+    This function sends M115 and waits up to `PROBE_TIMEOUT` seconds for the
+    response. It blocks, and is meant to be run in a worker thread.
+
+    Args:
+        port (str): The device name of the serial port.
+
+    Returns:
+        serial.Serial: The open connection if a printer answered, otherwise None.
+    """
+    # Errors are caught as OSError: serial.SerialException is a subclass, and a
+    # device that disappears raises a plain OSError (EIO)
+    try:
+        connection = serial.Serial(port, 115200, timeout=0.1)
+    except OSError:
+        return None
+
+    try:
+        # Have the driver hand over received bytes without delay
+        connection.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass  # Not supported on this platform or by this driver
+
+    received = bytearray()
+    try:
+        connection.write(b"M115\n")
+        deadline = time.monotonic() + PROBE_TIMEOUT
+        while time.monotonic() < deadline:
+            received += connection.read(connection.in_waiting or 1)
+            if RESPONSE_END_RE.search(received):
+                break
+    except OSError:
+        received.clear()
+
+    # Boards that reset when the port is opened answer with their boot messages
+    # instead of the M115 response, which still shows a printer is there
+    if not received:
+        _close_port(connection)
+        return None
+    connection.timeout = 2
+    return connection
+
+
+def _close_port(connection):
+    """
+    Close a serial connection, ignoring errors from a device that is already gone.
+    """
+    try:
+        connection.close()
+    except OSError:
+        pass
+
+
+def _probe_result(future):
+    """
+    Get the connection opened by a finished port probe.
+
+    Args:
+        future (concurrent.futures.Future): The finished probe.
+
+    Returns:
+        serial.Serial: The open connection, or None if the probe found no printer,
+                       was cancelled or failed.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def _close_probed_port(future):
+    """
+    Close the connection opened by a port probe that is no longer needed.
+    """
+    connection = _probe_result(future)
+    if connection is not None:
+        _close_port(connection)
 
 
-class ConnectionTab(BaseTab):
+class ConnectionTab(BaseTab):  # pylint: disable=too-many-instance-attributes
     """
     A class representing the connection tab in a Tkinter notebook.
 
@@ -43,6 +145,9 @@ class ConnectionTab(BaseTab):
         """
         super().__init__(tabs, app, tab_name)
         self.auto_home = tk.BooleanVar(value=False)  # Checkbox state
+        self._refresh_rows = []  # Parsed responses collected during a refresh
+        self._refresh_generation = 0  # Counts refreshes, to ignore outdated responses
+        self._probes = {}  # Port probes still running, mapped to their port
         self.setup_ui()
 
     def setup_ui(self):
@@ -94,40 +199,87 @@ class ConnectionTab(BaseTab):
         """
         Attempt to connect to the printer.
 
-        This method scans for available serial ports and tries to establish
-        a connection. If successful, it updates the connection status and
-        optionally performs auto-homing.
+        This method scans for available serial ports and probes them all in
+        parallel, connecting to the first one a printer answers on. If successful,
+        it updates the connection status and optionally performs auto-homing.
+
+        The port already connected to is not probed, since the probe would take
+        the printer's responses from the serial worker.
         """
-        ports = self.app.list_serial_ports()
+        connection = self.app.serial_connection
+        connected_port = connection.port if connection else None
+        ports = [
+            port for port in self.app.list_serial_ports() if port != connected_port
+        ]
         if not ports:
+            self.app.invalidate_ports_cache()
             messagebox.showerror(
                 "Error", "No serial ports found. Please connect your printer."
             )
             return
 
+        # Probe all ports at once, instead of waiting for each one in turn
+        self.connect_button.config(state=tk.DISABLED)
+        executor = ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(ports)))
         for port in ports:
-            try:
-                print(f"Attempting to connect to {port}...")
-                self.app.serial_connection = serial.Serial(port, 115200, timeout=2)
-                self.connection_status.config(text="Connected")
-                self.app.append_message(f"Printer connected on {port}.")
+            print(f"Attempting to connect to {port}...")
+            self._probes[executor.submit(probe_port, port)] = port
+        executor.shutdown(wait=False)
+        self._check_probes()
+
+    def _check_probes(self):
+        """
+        Connect to the first port found to answer, once its probe has finished.
+        """
+        for future in [future for future in self._probes if future.done()]:
+            port = self._probes.pop(future)
+            connection = _probe_result(future)
+            if connection is not None:
+                # Close the ports of the probes still running once they finish
+                for other in self._probes:
+                    other.cancel()
+                    other.add_done_callback(_close_probed_port)
+                self._probes.clear()
+                self._on_printer_found(port, connection)
+                return
+
+        if self._probes:
+            self.frame.after(50, self._check_probes)
+            return
+
+        # If no connection was successful, show an error and rescan next time
+        self.connect_button.config(state=tk.NORMAL)
+        self.app.invalidate_ports_cache()
+        messagebox.showerror("Error", "Failed to connect to any printer port.")
+
+    def _on_printer_found(self, port, connection):
+        """
+        Use the given connection to the printer.
+
+        The serial worker closes the previous connection, if any.
+
+        Args:
+            port (str): The device name of the serial port.
+            connection (serial.Serial): The open connection to the printer.
+        """
+        self.app.serial_connection = connection
+        self.app.firmware_capabilities = {}  # Until the refresh reads them
+        self.connect_button.config(state=tk.NORMAL)
+        self.connection_status.config(text="Connected")
+        self.app.append_message(f"Printer connected on {port}.")
 
-                # Perform auto-homing if the checkbox is selected
-                if self.auto_home.get():
-                    self.perform_auto_homing()
+        # Have the printer report its temperatures every second by itself
+        self.app.send_command("M155 S1")
 
-                # Enable the refresh button after connection
-                self.refresh_button.config(state=tk.NORMAL)
+        # Perform auto-homing if the checkbox is selected
+        if self.auto_home.get():
+            self.perform_auto_homing()
 
-                # Refresh treeview data
-                self.refresh_treeview()
-                break  # Exit the loop once a connection is successful
-            except serial.SerialException:
-                continue  # Try the next port if the current one fails
+        # Enable the refresh button after connection
+        self.refresh_button.config(state=tk.NORMAL)
 
-        else:
-            # If no connection was successful, show an error
-            messagebox.showerror("Error", "Failed to connect to any printer port.")
+        # Refresh treeview data
+        self.refresh_treeview()
 
     def perform_auto_homing(self):
         """
@@ -138,9 +290,7 @@ class ConnectionTab(BaseTab):
         """
         self.app.append_message("Sending auto-home command (G28)...")
         if self.app.serial_connection:
-            self.app.serial_connection.write(
-                "G28\n".encode()
-            )  # Send G-code to auto-home the printer
+            self.app.send_command("G28")  # Send G-code to auto-home the printer
             self.app.append_message("Auto-home command sent.")
 
     def refresh_treeview(self):
@@ -155,37 +305,74 @@ class ConnectionTab(BaseTab):
             messagebox.showerror("Error", "Not connected to a printer.")
             return
 
-        # Clear the current treeview content
+        # Queue all G-codes at once; the responses are handled as they arrive,
+        # without blocking the UI in between
+        self.refresh_button.config(state=tk.DISABLED)
+        self._refresh_rows = []
+        self._refresh_generation += 1
+        for key, gcode in REFRESH_GCODES:
+            self.app.send_command(
+                gcode,
+                partial(self._on_gcode_response, self._refresh_generation, key),
+            )
+
+    def _on_gcode_response(self, generation, key, response):
+        """
+        Parse the response to a G-code, and show all data once every G-code is done.
+
+        Responses to an earlier refresh, still arriving after a new one started
+        (e.g. after reconnecting), are ignored.
+
+        Args:
+            generation (int): The refresh the G-code was sent for.
+            key (str): The label of the treeview node for the G-code.
+            response (list of str): The lines received from the printer.
+        """
+        if generation != self._refresh_generation:
+            return
+
+        # Parse the response into (key, value) rows
+        rows = []
+        add_row, match_key_value = rows.append, KEY_VALUE_RE.match
+        for line in response:
+            match = match_key_value(line)
+            if match:
+                colon_key, equals_key, value = match.groups()
+                add_row((equals_key if colon_key is None else colon_key, value))
+            else:
+                add_row((line, ""))
+        self._refresh_rows.append((key, rows))
+
+        # Only the response to M115 lists capabilities
+        capabilities = parse_capabilities(response)
+        if capabilities:
+            self.app.firmware_capabilities = capabilities
+
+        if len(self._refresh_rows) == len(REFRESH_GCODES):
+            self._populate_treeview()
+            self.refresh_button.config(state=tk.NORMAL)
+            self.app.append_message("Data refreshed successfully.")
+
+    def _populate_treeview(self):
+        """
+        Replace the treeview content with the rows collected during the refresh.
+
+        All items are deleted and inserted in a single pass, so Tk lays out and
+        redraws the treeview once instead of after every response.
+        """
+        # Only the top-level items are listed; deleting them removes their children
         self.treeview.delete(*self.treeview.get_children())
 
-        # Send necessary G-code commands to get printer settings
-        gcodes = {
-            "Firmware Info": "M115",  # Get firmware information
-            "Current Settings": "M503",  # Get current printer settings
-            "Position": "M114",  # Get current position
-            "Endstop Status": "M119",  # Endstop status
-        }
-
-        # Loop through each G-code command, send it, and parse the response
-        for key, gcode in gcodes.items():
-            self.app.serial_connection.write(
-                f"{gcode}\n".encode()
-            )  # Send the G-code command
-            time.sleep(0.5)  # Wait for the printer to respond
-            response = self.app.read_response()  # Read the response from the printer
-
-            # Add parent node for the G-code command
-            parent_id = self.treeview.insert("", tk.END, text=key, values=("", ""))
-
-            # Parse the response and add child nodes
-            for line in response:
-                if ":" in line:
-                    k, v = map(str.strip, line.split(":", 1))
-                    self.treeview.insert(parent_id, tk.END, text="", values=(k, v))
-                elif "=" in line:
-                    k, v = map(str.strip, line.split("=", 1))
-                    self.treeview.insert(parent_id, tk.END, text="", values=(k, v))
-                else:
-                    self.treeview.insert(parent_id, tk.END, text="", values=(line, ""))
-
-        self.app.append_message("Data refreshed successfully.")
+        # Hide the data columns while inserting, so they are laid out only once
+        display_columns = self.treeview["displaycolumns"]
+        self.treeview.configure(displaycolumns=())
+        try:
+            insert = self.treeview.insert
+            for key, rows in self._refresh_rows:
+                # Add parent node for the G-code command, and its data as child nodes
+                parent_id = insert("", tk.END, text=key, values=("", ""))
+                for k, v in rows:
+                    insert(parent_id, tk.END, text="", values=(k, v))
+        finally:
+            self.treeview.configure(displaycolumns=display_columns)
+        self.treeview.update_idletasks()
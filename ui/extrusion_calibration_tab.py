@@ -6,13 +6,41 @@ It provides a user interface for calibrating the extruder's steps-per-millimeter
 filament usage, adjusting the extrusion factor, and monitoring the hotend temperature.
 """
 
-from tkinter import ttk, messagebox
+from functools import partial
+import math
 import time
+import tkinter as tk
+from tkinter import ttk, messagebox
 from ui.base_tab import BaseTab
-from utils.gcode_utils import send_gcode, parse_gcode_response
-
-
-class ExtrusionCalibrationTab(BaseTab):
+from utils.gcode_utils import (
+    parse_m92_e,
+    parse_temperature,
+    send_gcode,
+    send_gcode_batch,
+)
+
+# How long a temperature report is recent enough to skip requesting it, in s
+TEMPERATURE_CACHE_TTL = 0.75
+
+# Delay between temperature updates, in ms, and the shorter and longer delays used
+# while the temperature changes faster or slower than the given rates, in °C/s
+TEMPERATURE_UPDATE_MS = 1000
+FAST_TEMPERATURE_UPDATE_MS = 500
+FAST_TEMPERATURE_RATE = 0.5
+SLOW_TEMPERATURE_UPDATE_MS = 2000
+SLOW_TEMPERATURE_RATE = 0.05
+
+# At an update, the temperature is requested once the last report is older than this
+# fraction of the update delay. The margin leaves room for the printer to answer the
+# previous request, so firmware without auto-reporting is asked at every update.
+TEMPERATURE_REQUEST_FRACTION = 0.75
+
+# The M115 capability of firmware that accepts moves without a repeated G1. Marlin
+# reports "Cap:MOTION_MODES:1" when built with the GCODE_MOTION_MODES option.
+MODAL_GCODE_CAPABILITY = "MOTION_MODES"
+
+
+class ExtrusionCalibrationTab(BaseTab):  # pylint: disable=too-many-instance-attributes
     """
     A class representing the extrusion calibration tab in a Tkinter notebook.
 
@@ -39,6 +67,13 @@ class ExtrusionCalibrationTab(BaseTab):
             tab_name (str): The name to display on this tab.
         """
         super().__init__(tabs, app, tab_name)
+        self._on_heated = (None, None)  # Connection heating and what to call once hot
+        self._temperature_requested = False  # Waiting for an M105 response
+        self._previous_report = (None, 0.0)  # Temperature and time of the last report
+        self._temperature_rate = None  # Change between the last reports, in °C/s
+        self._extruder_steps = (None, None)  # Connection and its extruder steps per mm
+        self._last_displayed_temp = None  # The temperature in the label, if any
+        self._lengths = {}  # The length entered in each entry, by entry name
         self.setup_ui()
 
     def setup_ui(self):
@@ -48,17 +83,22 @@ class ExtrusionCalibrationTab(BaseTab):
         frame = ttk.Frame(self.frame, padding=10)
         frame.pack(fill="x")
 
-        # Inputs
+        # Inputs, which only accept numbers
+        validate_length = (self.frame.register(self._validate_length), "%W", "%P")
         ttk.Label(frame, text="Initial Filament Length (mm):").grid(
             row=0, column=0, sticky="w", padx=5
         )
-        self.initial_length = ttk.Entry(frame, width=10)
+        self.initial_length = ttk.Entry(
+            frame, width=10, validate="key", validatecommand=validate_length
+        )
         self.initial_length.grid(row=0, column=1, padx=5)
 
         ttk.Label(frame, text="Remaining Filament Length (mm):").grid(
             row=1, column=0, sticky="w", padx=5
         )
-        self.remaining_filament = ttk.Entry(frame, width=10)
+        self.remaining_filament = ttk.Entry(
+            frame, width=10, validate="key", validatecommand=validate_length
+        )
         self.remaining_filament.grid(row=1, column=1, padx=5)
 
         self.extrude_button = ttk.Button(
@@ -78,34 +118,192 @@ class ExtrusionCalibrationTab(BaseTab):
         self.output_area.pack(fill="x", padx=10, pady=5)
 
         # Live temperature display
+        self._temperature_text = tk.StringVar(
+            self.frame, value="Hotend Temp: Waiting for data..."
+        )
         self.temperature_label = ttk.Label(
-            self.frame, text="Hotend Temp: Waiting for data..."
+            self.frame, textvariable=self._temperature_text
         )
         self.temperature_label.pack(pady=10, padx=10)
 
-        # Start the temperature update loop
+        # Show the temperatures reported by the printer, and start the update loop
+        self.app.add_temperature_listener(self._on_temperature)
         self.update_temperature()
 
+    def _validate_length(self, entry_name, text):
+        """
+        Accept an edit of a length entry only if it leaves a number, and keep its value.
+
+        An empty entry, or a lone decimal point while typing, is accepted too, but
+        has no value.
+
+        Args:
+            entry_name (str): The Tk name of the edited entry.
+            text (str): The text of the entry after the edit.
+
+        Returns:
+            bool: Whether to accept the edit.
+        """
+        if text in ("", "."):
+            self._lengths[entry_name] = None
+            return True
+        try:
+            length = float(text)
+        except ValueError:
+            return False
+        if not math.isfinite(length):
+            return False
+        self._lengths[entry_name] = length
+        return True
+
+    def _get_length(self, entry, description):
+        """
+        Get the length entered in a length entry.
+
+        Args:
+            entry (ttk.Entry): The length entry.
+            description (str): What the length is, for the error message.
+
+        Returns:
+            float: The entered length.
+
+        Raises:
+            ValueError: If no length was entered.
+        """
+        length = self._lengths.get(str(entry))
+        if length is None:
+            raise ValueError(f"Please enter the {description}.")
+        return length
+
     def update_temperature(self):
         """
-        Update the hotend temperature every second.
+        Request the hotend temperature if the printer has not reported it lately.
+
+        Once connected, the printer reports its temperatures every second on its
+        own (M155 S1). M105 is only sent when the reports are not frequent enough
+        for the update delay, such as with firmware without auto-reporting, or
+        while heating.
+
+        Updates are more frequent while the temperature changes quickly, such as
+        while heating, and less frequent while it holds steady.
         """
-        current_temp = self.check_hotend_temperature()
-        if current_temp is not None:
-            self.temperature_label.config(text=f"Hotend Temp: {current_temp}°C")
-        else:
-            self.temperature_label.config(
-                text="Hotend Temp: Error reading temperature."
+        delay = self._update_delay()
+        since_report = time.monotonic() - self.app.last_temp_time
+        if (
+            since_report > delay / 1000 * TEMPERATURE_REQUEST_FRACTION
+            and not self._temperature_requested
+        ):
+            self._temperature_requested = True
+            self.request_hotend_temperature(self._on_temperature_response)
+
+        self.frame.after(delay, self.update_temperature)
+
+    def _update_delay(self):
+        """
+        Choose the delay between temperature updates from its rate of change.
+
+        Returns:
+            int: The delay, in ms.
+        """
+        rate = self._temperature_rate
+        if rate is None:
+            return TEMPERATURE_UPDATE_MS
+        if rate > FAST_TEMPERATURE_RATE:
+            return FAST_TEMPERATURE_UPDATE_MS
+        if rate < SLOW_TEMPERATURE_RATE:
+            return SLOW_TEMPERATURE_UPDATE_MS
+        return TEMPERATURE_UPDATE_MS
+
+    def _on_temperature_response(self, current_temp):
+        """
+        Show an error if the printer did not answer a temperature request.
+
+        A temperature report in the response is shown by `_on_temperature`.
+
+        Args:
+            current_temp (float): The hotend temperature, or None on failure.
+        """
+        self._temperature_requested = False
+        if current_temp is None:
+            self._last_displayed_temp = None
+            self._show_temperature("Hotend Temp: Error reading temperature.")
+
+    def _on_temperature(self, current_temp):
+        """
+        Show a hotend temperature reported by the printer.
+
+        Args:
+            current_temp (float): The reported temperature, as stored in
+                                  `app.last_temp`.
+        """
+        # Measure the rate of change between consecutive reports
+        report_time = self.app.last_temp_time
+        previous_temp, previous_time = self._previous_report
+        if previous_temp is not None and report_time > previous_time:
+            self._temperature_rate = abs(current_temp - previous_temp) / (
+                report_time - previous_time
             )
+        self._previous_report = (current_temp, report_time)
 
-        # Call this function again after 1000ms (1 second)
-        self.frame.after(1000, self.update_temperature)
+        # The text is only built when the temperature shown changes
+        if current_temp != self._last_displayed_temp:
+            self._last_displayed_temp = current_temp
+            self._show_temperature("Hotend Temp: " + format(current_temp, ".1f") + "°C")
+        self._heat_poll()
 
-    def check_hotend_temperature(self):
+    def _show_temperature(self, text):
+        """
+        Show a text in the temperature label, unless it is already shown.
+
+        Args:
+            text (str): The text to show.
+        """
+        if text != self._temperature_text.get():
+            self._temperature_text.set(text)
+
+    def check_hotend_temperature(self, callback):
         """
         Check the current hotend temperature.
+
+        A temperature reported less than `TEMPERATURE_CACHE_TTL` seconds ago is
+        passed to `callback` right away, without requesting it again.
+
+        Args:
+            callback (function): Called with the hotend temperature, or None.
         """
-        return self.send_and_receive_gcode("M105", "T:")
+        since_report = time.monotonic() - self.app.last_temp_time
+        if self.app.last_temp is not None and since_report < TEMPERATURE_CACHE_TTL:
+            callback(self.app.last_temp)
+            return
+        self.request_hotend_temperature(callback)
+
+    def request_hotend_temperature(self, callback):
+        """
+        Request the current hotend temperature from the printer with M105.
+
+        Args:
+            callback (function): Called with the hotend temperature, or None.
+        """
+        self.send_and_receive_gcode(
+            "M105", None, partial(self._parse_response, parse_temperature, callback)
+        )
+
+    @staticmethod
+    def _parse_response(parse, callback, response):
+        """
+        Pass the first value parsed from the response lines to a callback.
+
+        Args:
+            parse (function): Parses a line, returning None if it has no value.
+            callback (function): Called with the first value, or None if there is none.
+            response (list of str): The response lines received from the printer.
+        """
+        for line in response:
+            value = parse(line)
+            if value is not None:
+                callback(value)
+                return
+        callback(None)
 
     def extrude_length(self):
         """
@@ -115,8 +313,12 @@ class ExtrusionCalibrationTab(BaseTab):
             if not self.check_printer_connection():
                 return
 
-            initial_length = float(self.initial_length.get())
-            remaining_filament = float(self.remaining_filament.get())
+            initial_length = self._get_length(
+                self.initial_length, "initial filament length"
+            )
+            remaining_filament = self._get_length(
+                self.remaining_filament, "remaining filament length"
+            )
 
             # Calculate how much to extrude based on the difference between the
             # initial and remaining filament
@@ -126,85 +328,182 @@ class ExtrusionCalibrationTab(BaseTab):
                 raise ValueError("You must extrude at least 10mm.")
 
             # Check if the hotend is at 210°C
-            current_temp = self.check_hotend_temperature()
-            if current_temp is None:
-                raise ValueError("Failed to read hotend temperature.")
-            if current_temp < 210:
-                # If the hotend temperature is less than 210°C, heat it
-                self.heat_hotend()
-
-            # Send M302 to allow extrusion regardless of temperature
-            send_gcode(
-                self.app.serial_connection, "M302", self.app.append_message
-            )  # Enable extrusion regardless of temperature
-
-            # Move the extruder to start the extrusion
-            # Move the extruder by a small amount to ensure it’s primed
-            send_gcode(
-                self.app.serial_connection, "G1 E5 F300", self.app.append_message
-            )  # Move extruder by 5mm to prime it
-
-            # Now extrude the required amount
-            send_gcode(
-                self.app.serial_connection,
-                f"G1 E{length_to_extrude} F300",
-                self.app.append_message,
-            )
-            self.output_area.config(
-                text=f"Extruded {length_to_extrude}mm. Measure remaining filament length."
+            self.check_hotend_temperature(
+                partial(self._on_extrude_temperature, length_to_extrude)
             )
 
         except ValueError as e:
             messagebox.showerror("Error", str(e))
 
-    def heat_hotend(self):
+    def _on_extrude_temperature(self, length_to_extrude, current_temp):
         """
-        Heat the hotend to 210°C if the temperature is below 210°C.
+        Extrude once the hotend is at 210°C, heating it first if needed.
+
+        Args:
+            length_to_extrude (float): The length of filament to extrude, in mm.
+            current_temp (float): The hotend temperature, or None on failure.
         """
-        self.set_status_message("Heating hotend to 210°C...", error=True)
-        send_gcode(
-            self.app.serial_connection, "M104 S210", self.app.append_message
-        )  # Set hotend to 210°C
-        while True:
-            time.sleep(1)  # Wait for a second
-            current_temp = self.check_hotend_temperature()
-            if current_temp is not None and current_temp >= 210:
-                break
+        if current_temp is None:
+            messagebox.showerror("Error", "Failed to read hotend temperature.")
+        elif current_temp < 210:
+            # If the hotend temperature is less than 210°C, heat it first
+            # and extrude once it is hot enough
+            self.heat_hotend(partial(self._extrude, length_to_extrude))
+        else:
+            self._extrude(length_to_extrude)
+
+    def _extrude(self, length_to_extrude):
+        """
+        Prime the extruder and extrude the given length of filament.
+
+        Args:
+            length_to_extrude (float): The length of filament to extrude, in mm.
+        """
+        send_gcode_batch(
+            self.app.serial,
+            [
+                "M302",  # Enable extrusion regardless of temperature
+                "G1 E5 F300",  # Move extruder by 5mm to prime it
+                f"G1 E{length_to_extrude} F300",  # Extrude the required amount
+            ],
+            self.app.append_message,
+            modal=self.app.firmware_capabilities.get(MODAL_GCODE_CAPABILITY, False),
+        )
+        # Update the result once Tk is idle, together with any other pending redraws
+        self.frame.after_idle(
+            partial(
+                self.output_area.config,
+                text=f"Extruded {length_to_extrude}mm. "
+                "Measure remaining filament length.",
+            )
+        )
+
+    def heat_hotend(self, on_heated):
+        """
+        Heat the hotend to 210°C, and call `on_heated` once it is reached.
+
+        The temperature is checked each time the printer reports it, from the Tk
+        event loop, so the UI stays responsive while the hotend heats up.
+
+        Args:
+            on_heated (function): Called without arguments once the hotend is hot.
+        """
+        # M104 is sent again when already heating; setting the same target is
+        # harmless, and makes sure the printer heats after a reconnection
+        if send_gcode(self.app.serial, "M104 S210", self.app.append_message) is None:
+            self._on_heated = (None, None)
+            self.set_status_message("Error: No printer connected.", error=True)
+            return
+
+        if self._on_heated[0] is not self.app.serial_connection:
+            self.set_status_message("Heating hotend to 210°C...")
+        # Only the latest continuation is called, once
+        self._on_heated = (self.app.serial_connection, on_heated)
+
+    def _heat_poll(self):
+        """
+        Finish heating if the last reported temperature has reached 210°C.
+
+        No temperature is requested; the printer reports it on its own (M155), and
+        `update_temperature` requests it from firmware that does not.
+        """
+        connection, on_heated = self._on_heated
+        if connection is not self.app.serial_connection:
+            # The connection heating was closed, drop what was waiting for it
+            self._on_heated = (None, None)
+            return
+
+        current_temp = self.app.last_temp
+        if on_heated is None or current_temp is None or current_temp < 210:
+            return
+
         self.set_status_message("Hotend reached 210°C.")
+        self._on_heated = (None, None)
+        on_heated()
 
     def adjust_extrusion_factor(self):
         """
         Adjust the extruder steps based on the measured extrusion.
         """
-        initial_length = float(self.initial_length.get())
-        remaining_length = float(self.remaining_filament.get())
-        actual_extruded = initial_length - remaining_length
+        try:
+            initial_length = self._get_length(
+                self.initial_length, "initial filament length"
+            )
+            remaining_length = self._get_length(
+                self.remaining_filament, "remaining filament length"
+            )
+            actual_extruded = initial_length - remaining_length
+
+            if actual_extruded <= 0:
+                raise ValueError("Invalid extrusion measurement.")
 
-        if actual_extruded <= 0:
-            raise ValueError("Invalid extrusion measurement.")
+            adjustment_factor = 100 / actual_extruded
+            self.get_current_extruder_steps(
+                partial(self._set_extruder_steps, adjustment_factor)
+            )
+
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+
+    def _set_extruder_steps(self, adjustment_factor, current_steps):
+        """
+        Scale the extruder steps by the adjustment factor and save them.
 
-        adjustment_factor = 100 / actual_extruded
-        current_steps = self.get_current_extruder_steps()
+        Args:
+            adjustment_factor (float): The factor to multiply the steps with.
+            current_steps (float): The current extruder steps per mm.
+        """
         new_steps = current_steps * adjustment_factor
 
-        send_gcode(
-            self.app.serial_connection,
-            f"M92 E{new_steps:.2f}",
+        send_gcode_batch(
+            self.app.serial,
+            [f"M92 E{new_steps:.2f}", "M500"],
             self.app.append_message,
         )
-        send_gcode(self.app.serial_connection, "M500", self.app.append_message)
+        self._extruder_steps = (self.app.serial_connection, round(new_steps, 2))
 
-        self.output_area.config(
-            text=f"Extrusion adjusted. New steps/mm: {new_steps:.2f}"
+        self.frame.after_idle(
+            partial(
+                self.output_area.config,
+                text=f"Extrusion adjusted. New steps/mm: {new_steps:.2f}",
+            )
         )
 
-    def get_current_extruder_steps(self):
+    def get_current_extruder_steps(self, callback):
         """
         Get the current extruder steps from the printer by sending M503.
+
+        The steps are only read once per connection, and then kept up to date
+        when they are adjusted, so M503 is not sent for every adjustment.
+
+        Args:
+            callback (function): Called with the current extruder steps per mm.
         """
-        send_gcode(self.app.serial_connection, "M503", self.app.append_message)
-        response = parse_gcode_response(self.app.serial_connection)
-        for line in response:
-            if "M92" in line:
-                return float(line.split("E")[1])
-        raise ValueError("Failed to read current extruder steps.")
+        connection, steps = self._extruder_steps
+        if steps is not None and connection is self.app.serial_connection:
+            callback(steps)
+            return
+
+        self.send_and_receive_gcode(
+            "M503",
+            None,
+            partial(
+                self._parse_response,
+                parse_m92_e,
+                partial(self._on_extruder_steps, callback),
+            ),
+        )
+
+    def _on_extruder_steps(self, callback, current_steps):
+        """
+        Pass the extruder steps reported by M503 to a callback.
+
+        Args:
+            callback (function): Called with the current extruder steps per mm.
+            current_steps (float): The extruder steps per mm, or None on failure.
+        """
+        if current_steps is None:
+            messagebox.showerror("Error", "Failed to read current extruder steps.")
+            return
+        self._extruder_steps = (self.app.serial_connection, current_steps)
+        callback(current_steps)
@@ -1,76 +1,73 @@
 """
 Module for managing and initializing tabs in a Tkinter application.
 
-This module defines the `TabManager` class, which handles the registration
-and creation of tabs in a notebook widget. Additionally, it includes the
-`setup_tabs` function to initialize specific tabs like `ConnectionTab` and
-`ExtrusionCalibrationTab`.
+This module defines `TAB_SPECS`, the tabs of the application in display order,
+and the `setup_tabs` function, which creates them in a notebook widget. Only the
+first tab is created at startup; the module of any other tab is imported, and
+the tab created, the first time it is selected.
 """
 
-from ui.connection_tab import ConnectionTab
-from ui.extrusion_calibration_tab import ExtrusionCalibrationTab
+import importlib
+from tkinter import ttk
 
+# The tabs of the application, as ("module:TabClass", display name), in display order
+TAB_SPECS = (
+    ("ui.connection_tab:ConnectionTab", "Connection"),
+    ("ui.extrusion_calibration_tab:ExtrusionCalibrationTab", "Extrusion Calibration"),
+)
 
-class TabManager:
-    """
-    A class to manage the creation and registration of tabs in a Tkinter notebook.
-
-    The `TabManager` allows for registering tab classes along with their names,
-    and then creates instances of those tabs in the provided notebook widget.
 
-    Attributes:
-        tabs (ttk.Notebook): The notebook widget where tabs will be added.
-        app (Any): The main application instance providing shared resources and context.
-        tab_classes (list): A list of tuples containing tab classes and their corresponding names.
+def load_tab_class(spec):
     """
+    Import the module of a tab and return the tab class.
 
-    def __init__(self, tabs, app):
-        """
-        Initialize the TabManager instance.
-
-        Args:
-            tabs (ttk.Notebook): The notebook widget to manage.
-            app (Any): The main application instance.
-        """
-        self.tabs = tabs
-        self.app = app
-        self.tab_classes = []
-
-    def register_tab(self, tab_class, name):
-        """
-        Register a tab class with a name.
-
-        This method allows dynamic registration of tabs to be managed by the TabManager.
-
-        Args:
-            tab_class (type): The class representing the tab to be added.
-            name (str): The display name for the tab.
-        """
-        self.tab_classes.append((tab_class, name))
+    Args:
+        spec (str): The tab class, as "module:TabClass".
 
-    def create_tabs(self):
-        """
-        Create and add all registered tabs to the notebook.
+    Returns:
+        type: The class representing the tab.
 
-        This method iterates through the registered tab classes and initializes
-        each one with the notebook widget, application context, and tab name.
-        """
-        for tab_class, name in self.tab_classes:
-            tab_class(self.tabs, self.app, name)
+    Example:
+        load_tab_class("ui.connection_tab:ConnectionTab")
+        # Output: <class 'ui.connection_tab.ConnectionTab'>
+    """
+    module_name, class_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 def setup_tabs(tabs, app):
     """
-    Set up the tabs for the application using the TabManager.
+    Set up the tabs for the application.
 
-    This function initializes a `TabManager`, registers the required tabs,
-    and creates them in the provided notebook widget.
+    This function creates the first tab listed in `TAB_SPECS` right away, and an
+    empty placeholder for each of the other tabs. A placeholder is replaced by its
+    tab, initialized with the notebook widget, application context, and tab name,
+    when it is first selected.
 
     Args:
         tabs (ttk.Notebook): The notebook widget where tabs will be added.
         app (Any): The main application instance providing shared resources.
     """
-    manager = TabManager(tabs, app)
-    manager.register_tab(ConnectionTab, "Connection")
-    manager.register_tab(ExtrusionCalibrationTab, "Extrusion Calibration")
-    manager.create_tabs()
+    (first_spec, first_name), *other_specs = TAB_SPECS
+    load_tab_class(first_spec)(tabs, app, first_name)
+
+    pending = {}  # The specs of the tabs not created yet, by placeholder
+    for spec, name in other_specs:
+        placeholder = ttk.Frame(tabs)
+        tabs.add(placeholder, text=name)
+        pending[str(placeholder)] = (spec, name)
+
+    def on_tab_changed(_event):
+        placeholder = tabs.select()
+        if placeholder not in pending:
+            return
+        spec, name = pending.pop(placeholder)
+        index = tabs.index(placeholder)
+        tab = load_tab_class(spec)(tabs, app, name)
+        # The tab was added at the end, move it in place of its placeholder
+        tabs.insert(index, tab.frame)
+        tabs.select(tab.frame)
+        tabs.forget(placeholder)
+        tabs.nametowidget(placeholder).destroy()
+
+    tabs.bind("<<NotebookTabChanged>>", on_tab_changed)
@@ -2,57 +2,251 @@
 Module for sending G-code commands and parsing responses.
 
 This module provides utility functions to send G-code commands to a connected
-3D printer via a serial connection and to parse responses received from the printer.
+3D printer via the serial worker and to parse responses received from the printer.
 """
 
+import re
 
-def send_gcode(serial_connection, gcode, callback=None):
+# Matches the 'ok' or 'error' line that ends the printer's response to a G-code
+RESPONSE_END_RE = re.compile(rb"^\s*(?:ok|error)\b", re.IGNORECASE | re.MULTILINE)
+
+# Matches the hotend temperature in a temperature report, e.g. "ok T:210.0 /210.0".
+# The word boundary skips capabilities such as "Cap:BUILD_PERCENT:1".
+TEMPERATURE_RE = re.compile(r"\bT:\s*(?P<t>-?\d+(?:\.\d+)?)")
+
+# Matches the extruder steps per mm in an M92 line, e.g. "M92 X80.00 Y80.00 E93.00"
+M92_E_RE = re.compile(r"\bM92\b.*?\bE(?P<e>-?\d+(?:\.\d+)?)")
+
+# G-codes whose motion mode stays active, so that with modal G-code the following
+# moves can be sent as parameters only (e.g. "G1 E5 F300" then "E90 F300")
+MOTION_GCODES = frozenset(("G0", "G1", "G2", "G3"))
+
+# Maximum number of encoded G-code commands kept by `encode_gcode`
+MAX_ENCODED_GCODES = 256
+
+# Encoded G-code lines, by command, so constant commands are only encoded once
+_ENC_CACHE = {}
+
+
+def decode_lines(data):
+    """
+    Decode data received from the printer into a list of lines.
+
+    The data is decoded in one go rather than line by line. Splitting at newlines
+    never cuts a UTF-8 character in two, so it is safe to call on any prefix of
+    the received data that ends with a newline.
+
+    Args:
+        data (bytes): The raw data read from the serial connection.
+
+    Returns:
+        list of str: The non-empty lines, stripped of surrounding whitespace.
+
+    Example:
+        decode_lines(b"echo:busy\nok\n")
+        # Output: ["echo:busy", "ok"]
+    """
+    lines = (line.strip() for line in data.decode("utf-8", "replace").split("\n"))
+    return [line for line in lines if line]
+
+
+def take_lines(buffer):
+    """
+    Remove the complete lines from a buffer of received data and decode them.
+
+    A partial line at the end is left in the buffer, to be completed by data
+    received later.
+
+    Args:
+        buffer (bytearray): The data received from the printer so far.
+
+    Returns:
+        list of str: The non-empty complete lines, stripped of surrounding whitespace.
+
+    Example:
+        buffer = bytearray(b"ok\necho:bu")
+        take_lines(buffer)
+        # Output: ["ok"], with buffer left as bytearray(b"echo:bu")
+    """
+    end = buffer.rfind(b"\n") + 1
+    if not end:
+        return []
+    lines = decode_lines(buffer[:end])
+    del buffer[:end]
+    return lines
+
+
+def parse_temperature(line):
+    """
+    Parse the hotend temperature from a line received from the printer.
+
+    Args:
+        line (str): A line received from the printer.
+
+    Returns:
+        float: The current hotend temperature, or None if the line has none.
+
+    Example:
+        parse_temperature("ok T:209.8 /210.0 B:60.0 /60.0 @:64 B@:0")
+        # Output: 209.8
+    """
+    match = TEMPERATURE_RE.search(line)
+    return float(match["t"]) if match else None
+
+
+def parse_capabilities(lines):
+    """
+    Parse the firmware capabilities from the response to M115.
+
+    Args:
+        lines (list of str): The lines received in response to M115.
+
+    Returns:
+        dict: Whether each capability reported is enabled, by capability name.
+
+    Example:
+        # Excerpt of the M115 response of Marlin 2.1 built with GCODE_MOTION_MODES
+        parse_capabilities([
+            "FIRMWARE_NAME:Marlin bugfix-2.1.x (Jan 10 2024 12:00:00) ...",
+            "Cap:EEPROM:1",
+            "Cap:AUTOREPORT_TEMP:1",
+            "Cap:MOTION_MODES:1",
+            "Cap:ARCS:1",
+            "Cap:MEATPACK:0",
+            "ok",
+        ])
+        # Output: {"EEPROM": True, "AUTOREPORT_TEMP": True, "MOTION_MODES": True,
+        #          "ARCS": True, "MEATPACK": False}
+    """
+    capabilities = {}
+    for line in lines:
+        if line.startswith("Cap:"):
+            name, _, value = line[4:].partition(":")
+            capabilities[name] = value.strip() == "1"
+    return capabilities
+
+
+def parse_m92_e(line):
+    """
+    Parse the extruder steps per mm from an M92 line, as reported by M503.
+
+    Args:
+        line (str): A line received from the printer.
+
+    Returns:
+        float: The extruder steps per mm, or None if the line has none.
+
+    Example:
+        parse_m92_e("echo:  M92 X80.00 Y80.00 Z400.00 E93.00")
+        # Output: 93.0
+    """
+    match = M92_E_RE.search(line)
+    return float(match["e"]) if match else None
+
+
+def encode_gcode(gcode):
     """
-    Send a G-code command to the 3D printer via the serial connection.
+    Encode a G-code command into the line sent to the printer.
 
-    This function writes a G-code command to the printer through the provided
-    serial connection. Optionally, a callback function can be used to log or
-    display the sent command.
+    Encoded lines are cached, so constant commands such as the M105 sent every
+    second are only stripped and encoded once. Commands with varying arguments
+    fill the cache up to `MAX_ENCODED_GCODES` entries, and are encoded every
+    time after that.
 
     Args:
-        serial_connection (serial.Serial): The serial connection to the printer.
+        gcode (str): The G-code command. It will be stripped of whitespace.
+
+    Returns:
+        bytes: The command followed by a newline.
+
+    Example:
+        encode_gcode(" M105 ")
+        # Output: b"M105\n"
+    """
+    line = _ENC_CACHE.get(gcode)
+    if line is None:
+        line = f"{gcode.strip()}\n".encode()
+        if len(_ENC_CACHE) < MAX_ENCODED_GCODES:
+            _ENC_CACHE[gcode] = line
+    return line
+
+
+def send_gcode(serial_worker, gcode, callback=None):
+    """
+    Send a G-code command to the 3D printer via the serial worker.
+
+    This function queues a G-code command for the printer, if the worker is
+    connected. Optionally, a callback function can be used to log or display
+    the sent command.
+
+    Args:
+        serial_worker (SerialWorker): The worker sending commands to the printer.
         gcode (str): The G-code command to send. It will be stripped of whitespace.
         callback (function, optional): A function to handle logging or other actions
                                         after sending the command. It receives a string
                                         argument with the sent G-code message.
 
+    Returns:
+        concurrent.futures.Future: Resolves to the response lines, or None if the
+                                   worker is not connected and nothing was sent.
+
     Example:
-        send_gcode(serial_conn, "M105", print)
+        send_gcode(app.serial, "M105", print)
         # Output: Sent: M105
     """
-    if serial_connection:
-        serial_connection.write(f"{gcode.strip()}\n".encode())
-        if callback:
-            callback(f"Sent: {gcode}")
+    if serial_worker.connection is None:
+        return None
+    future = serial_worker.submit(encode_gcode(gcode))
+    if callback:
+        callback(f"Sent: {gcode}")
+    return future
 
 
-def parse_gcode_response(serial_connection):
+def send_gcode_batch(serial_worker, gcodes, callback=None, modal=False):
     """
-    Parse the response from the 3D printer after sending G-code commands.
+    Send several G-code commands to the 3D printer with a single write.
+
+    The commands are queued as one block, which the serial worker writes at
+    once. This saves a system call and a USB transfer per command, and keeps the
+    host from stalling between them.
 
-    This function reads lines from the serial connection until all available
-    data is retrieved and decodes each line. The response is returned as a list
-    of strings, with each line of the response as a separate item.
+    With `modal`, a move using the same motion G-code as the move before it is sent
+    as its parameters only. Only use it with firmware that supports modal G-code;
+    other firmware rejects the shortened lines.
 
     Args:
-        serial_connection (serial.Serial): The serial connection to the printer.
+        serial_worker (SerialWorker): The worker sending commands to the printer.
+        gcodes (list of str): The G-code commands to send, in order. They will be
+                              stripped of whitespace.
+        callback (function, optional): A function to handle logging or other actions
+                                        after sending the commands. It is called once
+                                        per command with the sent G-code message.
+        modal (bool, optional): Whether to shorten moves using modal G-code.
 
     Returns:
-        list of str: A list of response lines received from the printer.
+        concurrent.futures.Future: Resolves to the response lines of all commands,
+                                   or None if the worker is not connected and
+                                   nothing was sent.
 
     Example:
-        response = parse_gcode_response(serial_conn)
-        print(response)
-        # Output: ["ok T:210 /210 B:60 /60", "echo:busy processing"]
+        send_gcode_batch(app.serial, ["M92 E93.00", "M500"], print)
+        # Output: Sent: M92 E93.00
+        #         Sent: M500
     """
-    response = []
-    if serial_connection:
-        while serial_connection.in_waiting > 0:
-            line = serial_connection.readline().decode().strip()
-            response.append(line)
-    return response
+    if serial_worker.connection is None:
+        return None
+    lines = []
+    motion_mode = None
+    for gcode in gcodes:
+        line = gcode
+        if modal:
+            command, _, params = gcode.strip().partition(" ")
+            if command == motion_mode and params:
+                line = params
+            motion_mode = command if command in MOTION_GCODES else None
+        lines.append(encode_gcode(line))
+    future = serial_worker.submit(b"".join(lines))
+    if callback:
+        for gcode in gcodes:
+            callback(f"Sent: {gcode}")
+    return future
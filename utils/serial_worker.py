@@ -0,0 +1,313 @@
+"""
+Module for communicating with the 3D printer from a worker thread.
+
+This module defines the `SerialWorker` class, which owns the serial connection to
+the printer. G-code commands are queued from the Tkinter thread, sent by the worker,
+and their responses are handed back through `concurrent.futures.Future` objects,
+so a slow or jammed serial link never blocks the user interface.
+"""
+
+from concurrent.futures import Future
+import queue
+import threading
+import time
+from utils.gcode_utils import RESPONSE_END_RE, decode_lines, encode_gcode, take_lines
+
+# How long to wait for more data before giving up on a response, in seconds. Marlin
+# sends "busy:" keep-alive lines every 2 seconds during long commands such as G28,
+# so this must be longer for those commands not to time out between them.
+RESPONSE_TIMEOUT = 3.0
+
+# Maximum size of the commands written to the printer at once, in bytes. Marlin's
+# serial receive buffer holds 128 bytes by default.
+MAX_BURST_BYTES = 96
+
+# How often data sent by the printer on its own is read between commands, in seconds
+IDLE_READ_INTERVAL = 0.1
+
+# Default maximum number of G-code lines sent to the printer per second, so quick
+# sequences of moves cannot overrun the planner of slow controllers
+MAX_GCODE_PER_SECOND = 250
+
+
+class SerialWorker(threading.Thread):  # pylint: disable=too-many-instance-attributes
+    """
+    A worker thread that sends G-code commands to the printer and reads the responses.
+
+    Commands are sent in the order they are submitted. Commands queued together are
+    written to the printer at once, as long as they fit in `MAX_BURST_BYTES`, and
+    their responses are then read in order.
+
+    Lines are sent no faster than `max_gcode_per_second`. A burst of lines moves
+    the time the next burst may be sent forward by the time its lines take at that
+    rate, and the worker sleeps until then before writing.
+
+    Every line received, whether part of a response or sent by the printer on its
+    own (such as temperature auto-reports), is also passed to `on_lines`.
+
+    The connection may be replaced at any time. The worker closes the previous
+    one itself, once it is done with it, and drops what was received on it.
+
+    Attributes:
+        connection (serial.Serial): The serial connection to the printer, or None.
+    """
+
+    def __init__(
+        self, notify=None, on_lines=None, max_gcode_per_second=MAX_GCODE_PER_SECOND
+    ):
+        """
+        Initialize the SerialWorker instance.
+
+        Args:
+            notify (function, optional): Called from the worker thread, without
+                                         arguments, after responses were received.
+            on_lines (function, optional): Called from the worker thread with each
+                                           list of lines received.
+            max_gcode_per_second (float, optional): The maximum number of G-code
+                                                    lines sent per second.
+        """
+        super().__init__(daemon=True)
+        self.connection = None
+        self._active_connection = None  # The connection the worker last used
+        self._notify = notify
+        self._on_lines = on_lines
+        self._commands = queue.Queue()
+        self._rx_buffer = bytearray()  # Data received after the last response
+        self._min_interval = 1.0 / max_gcode_per_second  # Between lines, in seconds
+        self._next_tx = 0.0  # When the next line may be sent, in monotonic time
+
+    def submit(self, gcode, match=None):
+        """
+        Queue G-code to be sent to the printer.
+
+        Args:
+            gcode (str or bytes): The G-code command to send, or encoded lines
+                                  (each ending with a newline) to write as is.
+            match (str, optional): A keyword to search for in the response.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the list of response lines, or
+                                       with `match`, to the first line containing
+                                       it (None if there is none).
+
+        Example:
+            future = worker.submit("M105", match="T:")
+            print(future.result())
+            # Output: "ok T:200 /200"
+        """
+        if isinstance(gcode, str):
+            gcode = encode_gcode(gcode)
+        future = Future()
+        self._commands.put((gcode, match, future))
+        return future
+
+    def run(self):
+        """
+        Send the queued commands and collect their responses, until the program exits.
+        """
+        leftover = None
+        while True:
+            try:
+                burst = [leftover or self._commands.get(timeout=IDLE_READ_INTERVAL)]
+            except queue.Empty:
+                try:
+                    self._read_unsolicited()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self._drop_connection(e)
+                continue
+            leftover = None
+            size = len(burst[0][0])
+            while True:
+                try:
+                    command = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+                size += len(command[0])
+                if size > MAX_BURST_BYTES:
+                    leftover = command
+                    break
+                burst.append(command)
+
+            try:
+                self._send_burst(burst)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Keep the worker alive for the commands queued after this burst
+                self._drop_connection(e)
+                self._resolve(burst, [])
+            if self._notify:
+                self._notify()
+
+    def _send_burst(self, burst):
+        """
+        Write a burst of commands at once and resolve their futures with the responses.
+
+        Args:
+            burst (list of tuple): The (gcode, match, future) of each command.
+        """
+        responses = []
+        connection = self._switch_connection()
+        if connection:
+            payload = b"".join(gcode for gcode, _, _ in burst)
+            self._wait_for_rate_limit(payload.count(b"\n"))
+            try:
+                connection.write(payload)
+                for gcode, _, _ in burst:
+                    # Each line sent gets its own response
+                    response = []
+                    for _ in range(gcode.count(b"\n")):
+                        response += self.read_response()
+                    responses.append(response)
+            except OSError as e:
+                # serial.SerialException, or the OSError raised once the printer
+                # is unplugged
+                self._drop_connection(e)
+        self._resolve(burst, responses)
+
+    @staticmethod
+    def _resolve(burst, responses):
+        """
+        Resolve the futures of a burst of commands that are not resolved yet.
+
+        Commands without a response, such as those not sent because of an error,
+        get an empty response.
+
+        Args:
+            burst (list of tuple): The (gcode, match, future) of each command.
+            responses (list of list of str): The responses received, in order.
+        """
+        responses = responses + [[] for _ in range(len(burst) - len(responses))]
+        for (_, match, future), response in zip(burst, responses):
+            if future.done():
+                continue
+            if match is None:
+                future.set_result(response)
+            else:
+                future.set_result(
+                    next((line for line in response if match in line), None)
+                )
+
+    def _drop_connection(self, error):
+        """
+        Close the serial connection after an error, so the worker stops using it.
+
+        Args:
+            error (Exception): The error communicating with the printer.
+        """
+        print(f"Error communicating with serial port: {error}")
+        connection, self._active_connection = self._active_connection, None
+        if self.connection is connection:  # Unless it was replaced meanwhile
+            self.connection = None
+        self._rx_buffer = bytearray()
+        self._close(connection)
+
+    def _switch_connection(self):
+        """
+        Get the connection to use, switching to the one set last if it changed.
+
+        The previous connection is closed, and data received on it is dropped.
+
+        Returns:
+            serial.Serial: The serial connection to the printer, or None.
+        """
+        connection = self.connection
+        if connection is not self._active_connection:
+            previous, self._active_connection = self._active_connection, connection
+            self._rx_buffer = bytearray()
+            self._close(previous)
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        """
+        Close a serial connection, if any, ignoring errors from a device that is
+        already gone.
+        """
+        if connection is not None:
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    def _wait_for_rate_limit(self, line_count):
+        """
+        Sleep until the given number of lines may be sent, and reserve their time.
+
+        Args:
+            line_count (int): The number of lines about to be sent.
+        """
+        delay = self._next_tx - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_tx = (
+            max(self._next_tx, time.monotonic()) + line_count * self._min_interval
+        )
+
+    def _read_unsolicited(self):
+        """
+        Read the complete lines the printer sent on its own, between commands.
+        """
+        connection = self._switch_connection()
+        if not connection:
+            return
+        try:
+            if connection.in_waiting:
+                self._rx_buffer += connection.read(connection.in_waiting)
+        except OSError as e:
+            self._drop_connection(e)
+            return
+
+        lines = take_lines(self._rx_buffer)
+        if lines and self._on_lines:
+            self._on_lines(lines)
+            if self._notify:
+                self._notify()
+
+    def read_response(self):
+        """
+        Read the response from the printer via the serial connection.
+
+        This method reads whatever the printer has sent in bulk, rather than line
+        by line, until a line starting with 'ok' or 'error' is received, indicating
+        the end of the response, or nothing was received for `RESPONSE_TIMEOUT`
+        seconds. Busy messages sent during long moves keep the response alive.
+
+        Returns:
+            list of str: A list of lines received as a response from the printer.
+
+        Raises:
+            OSError: If reading from the serial connection fails, e.g. because the
+                     printer was unplugged (serial.SerialException is a subclass).
+
+        Example:
+            response = worker.read_response()
+            print(response)
+            # Output: ["ok T:200 /200"]
+        """
+        connection = self._active_connection
+        if not connection:
+            return []
+
+        buffer, self._rx_buffer = self._rx_buffer, bytearray()
+        unchecked = buffer.rfind(b"\n") + 1  # End of the lines checked for the end
+        response_end = RESPONSE_END_RE.search(buffer, 0, unchecked)
+        deadline = time.monotonic() + RESPONSE_TIMEOUT
+        while not response_end and time.monotonic() < deadline:
+            # Take everything that is buffered, or wait for the next byte
+            chunk = connection.read(connection.in_waiting or 1)
+            if not chunk:
+                continue
+            buffer += chunk
+            deadline = time.monotonic() + RESPONSE_TIMEOUT
+            end = buffer.rfind(b"\n") + 1
+            response_end = RESPONSE_END_RE.search(buffer, unchecked, end)
+            unchecked = end
+
+        # Anything after the line that ends the response is kept for the next one
+        if response_end:
+            end = buffer.find(b"\n", response_end.end()) + 1
+            self._rx_buffer = buffer[end:]
+            del buffer[end:]
+        lines = decode_lines(buffer)
+        if lines and self._on_lines:
+            self._on_lines(lines)
+        return lines